@@ -2,25 +2,25 @@ from __future__ import annotations
 
 import secrets
 import time
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
 
-from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic import BaseModel, Field
 
-from .limiter import allow_request
 from .state import (
     GAME_PUBLIC,
     GAME_SEATS,
     claim_seat,
     default_game_state,
     expire_seats,
+    game_lock,
     get_game,
     get_game_id,
-    MAX_HISTORY,
     save_state,
     seat_player_for_session,
-    state_lock,
     with_meta,
+    with_meta_json,
 )
 
 router = APIRouter()
@@ -44,258 +44,419 @@ class SeatRequest(BaseModel):
 
 
 FILES = ["a", "b", "c", "d", "e", "f", "g", "h"]
+PIECES = "PNBRQKpnbrqk"
+PIECE_CODES = PIECES.encode("ascii")
+EMPTY_BOARD = b"." * 64
+PIECE_LUTS = [bytes(49 if code == ord(piece) else 48 for code in range(256)) for piece in PIECES]
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+OCC_WHITE = 12
+OCC_BLACK = 13
+PIECE_TYPE = bytes(range(6)) * 2
+PIECE_OCCUPANCY = bytes([OCC_WHITE] * 6 + [OCC_BLACK] * 6)
+PIECE_COLOR = bytes(
+    1 if chr(code) in PIECES[:6] else 2 if chr(code) in PIECES[6:] else 0 for code in range(128)
+)
+FULL_BOARD = (1 << 64) - 1
+FILE_A = sum(1 << (row * 8) for row in range(8))
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL_BOARD ^ FILE_A
+NOT_FILE_H = FULL_BOARD ^ FILE_H
+NOT_FILE_AB = NOT_FILE_A ^ (FILE_A << 1)
+NOT_FILE_GH = NOT_FILE_H ^ (FILE_H >> 1)
+ROW_MASKS = [0xFF << (row * 8) for row in range(8)]
+PROMOTION_ROWS = ROW_MASKS[0] | ROW_MASKS[7]
+
+Move = Tuple[int, int, int, int]
+COORD_LUT = {f"{file}{rank}": {"row": 8 - rank, "col": col} for col, file in enumerate(FILES) for rank in range(1, 9)}
 STATE_RATE_LIMIT = (240, 60)
 MUTATION_RATE_LIMIT = (30, 60)
+ROUTE_LIMITS = {
+    "/state": ("state", *STATE_RATE_LIMIT),
+    "/seat": ("seat", *MUTATION_RATE_LIMIT),
+    "/move": ("move", *MUTATION_RATE_LIMIT),
+    "/reset": ("reset", *MUTATION_RATE_LIMIT),
+}
 
 
 def get_session_id(request: Request) -> str:
-    session_id = request.session.get("session_id")
+    session_id = getattr(request.state, "session_id", None) or request.session.get("session_id")
     if not session_id:
         session_id = secrets.token_urlsafe(16)
         request.session["session_id"] = session_id
     return session_id
 
 
-def client_bucket(request: Request, action: str) -> str:
-    forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        client_ip = forwarded.split(",")[0].strip()
-    else:
-        client_ip = request.client.host if request.client else "unknown"
-    return f"{client_ip}:{action}"
-
-
-def enforce_rate_limit(request: Request, action: str, limit: int, window: int) -> None:
-    bucket = client_bucket(request, action)
-    if not allow_request(bucket, limit, window):
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
+def error_response(
+    game_id: str, current: Dict[str, Any], session_id: str, message: str, seat_changed: bool = False
+) -> Dict[str, Any]:
+    if seat_changed:
+        current["version"] += 1
+        save_state()
+    return {"ok": False, "error": message, "state": with_meta(game_id, current, session_id)}
 
 
 def coord_to_index(coord: str) -> Optional[Dict[str, int]]:
-    if len(coord) != 2:
-        return None
-    file = coord[0]
-    try:
-        rank = int(coord[1])
-    except ValueError:
-        return None
-    col = FILES.index(file) if file in FILES else -1
-    if col < 0:
-        return None
-    row = 8 - rank
-    if row < 0 or row > 7:
-        return None
-    return {"row": row, "col": col}
+    return COORD_LUT.get(coord)
 
 
 def get_player(piece: str) -> int:
-    if piece == ".":
-        return 0
-    return 1 if piece.isupper() else 2
+    return PIECE_COLOR[ord(piece)]
 
 
 def is_inside(row: int, col: int) -> bool:
     return 0 <= row < 8 and 0 <= col < 8
 
 
-def is_friendly(board: List[List[str]], row: int, col: int, player: int) -> bool:
-    piece = board[row][col]
-    return piece != "." and get_player(piece) == player
-
-
-def apply_move(board: List[List[str]], from_idx: Dict[str, int], to_idx: Dict[str, int]) -> None:
-    piece = board[from_idx["row"]][from_idx["col"]]
-    board[to_idx["row"]][to_idx["col"]] = piece
-    board[from_idx["row"]][from_idx["col"]] = "."
-    if piece.lower() == "p" and (to_idx["row"] == 0 or to_idx["row"] == 7):
-        board[to_idx["row"]][to_idx["col"]] = "Q" if get_player(piece) == 1 else "q"
-
-
-def rows_to_board(rows: List[str]) -> List[List[str]]:
-    return [list(row) for row in rows]
-
-
-def board_to_rows(board: List[List[str]]) -> List[str]:
-    return ["".join(row) for row in board]
-
-
-def get_pseudo_moves(board: List[List[str]], row: int, col: int, piece: str) -> List[Dict[str, int]]:
-    moves: List[Dict[str, int]] = []
-    piece_type = piece.lower()
-    player = get_player(piece)
-    is_white = player == 1
-
-    if piece_type == "p":
-        direction = -1 if is_white else 1
-        start_row = 6 if is_white else 1
-        next_row = row + direction
-        if is_inside(next_row, col) and board[next_row][col] == ".":
-            moves.append({"row": next_row, "col": col})
-            two_row = row + direction * 2
-            if row == start_row and board[two_row][col] == ".":
-                moves.append({"row": two_row, "col": col})
-        for delta in (-1, 1):
-            capture_row = row + direction
-            capture_col = col + delta
-            if (
-                is_inside(capture_row, capture_col)
-                and board[capture_row][capture_col] != "."
-                and get_player(board[capture_row][capture_col]) != player
-            ):
-                moves.append({"row": capture_row, "col": capture_col})
-    elif piece_type == "n":
-        jumps = [
-            (2, 1), (1, 2), (-1, 2), (-2, 1),
-            (-2, -1), (-1, -2), (1, -2), (2, -1),
-        ]
-        for dr, dc in jumps:
-            target_row = row + dr
-            target_col = col + dc
-            if is_inside(target_row, target_col) and not is_friendly(board, target_row, target_col, player):
-                moves.append({"row": target_row, "col": target_col})
-    elif piece_type in ("b", "r", "q"):
-        directions: List[tuple[int, int]] = []
-        if piece_type in ("b", "q"):
-            directions += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-        if piece_type in ("r", "q"):
-            directions += [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        for dr, dc in directions:
-            target_row = row + dr
-            target_col = col + dc
-            while is_inside(target_row, target_col):
-                if board[target_row][target_col] == ".":
-                    moves.append({"row": target_row, "col": target_col})
-                else:
-                    if not is_friendly(board, target_row, target_col, player):
-                        moves.append({"row": target_row, "col": target_col})
-                    break
-                target_row += dr
-                target_col += dc
-    elif piece_type == "k":
-        for dr in (-1, 0, 1):
-            for dc in (-1, 0, 1):
-                if dr == 0 and dc == 0:
-                    continue
-                target_row = row + dr
-                target_col = col + dc
-                if is_inside(target_row, target_col) and not is_friendly(board, target_row, target_col, player):
-                    moves.append({"row": target_row, "col": target_col})
+def iter_bits(bits: int) -> Iterator[int]:
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def build_rays(dr: int, dc: int) -> List[int]:
+    rays: List[int] = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask = 0
+        target_row = row + dr
+        target_col = col + dc
+        while is_inside(target_row, target_col):
+            mask |= 1 << (target_row * 8 + target_col)
+            target_row += dr
+            target_col += dc
+        rays.append(mask)
+    return rays
+
+
+# Directions 0-3 walk towards higher square indexes, 4-7 towards lower ones.
+RAYS = [
+    build_rays(dr, dc)
+    for dr, dc in ((1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (0, -1), (-1, -1), (-1, 1))
+]
+ROOK_DIRECTIONS = (0, 1, 4, 5)
+BISHOP_DIRECTIONS = (2, 3, 6, 7)
+
+
+def knight_attacks(bits: int) -> int:
+    return (
+        ((bits << 17) & NOT_FILE_A)
+        | ((bits << 15) & NOT_FILE_H)
+        | ((bits << 10) & NOT_FILE_AB)
+        | ((bits << 6) & NOT_FILE_GH)
+        | ((bits >> 17) & NOT_FILE_H)
+        | ((bits >> 15) & NOT_FILE_A)
+        | ((bits >> 10) & NOT_FILE_GH)
+        | ((bits >> 6) & NOT_FILE_AB)
+    ) & FULL_BOARD
+
+
+def king_attacks(bits: int) -> int:
+    sideways = ((bits << 1) & NOT_FILE_A) | ((bits >> 1) & NOT_FILE_H)
+    row = bits | sideways
+    return (sideways | (row << 8) | (row >> 8)) & FULL_BOARD
+
+
+def pawn_attacks(bits: int, player: int) -> int:
+    if player == 1:
+        return ((bits >> 9) & NOT_FILE_H) | ((bits >> 7) & NOT_FILE_A)
+    return (((bits << 7) & NOT_FILE_H) | ((bits << 9) & NOT_FILE_A)) & FULL_BOARD
+
+
+KNIGHT_ATTACKS = tuple(knight_attacks(1 << square) for square in range(64))
+KING_ATTACKS = tuple(king_attacks(1 << square) for square in range(64))
+PAWN_ATTACKS_W = tuple(pawn_attacks(1 << square, 1) for square in range(64))
+PAWN_ATTACKS_B = tuple(pawn_attacks(1 << square, 2) for square in range(64))
+
+
+def ray_attacks(square: int, occupied: int, directions: Tuple[int, ...]) -> int:
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupied
+        if blockers:
+            if direction < 4:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[direction][first]
+        attacks |= ray
+    return attacks
+
+
+def rows_to_bitboards(rows: List[str]) -> List[int]:
+    squares = "".join(rows).encode("ascii")[::-1]
+    bitboards = [int(squares.translate(table), 2) for table in PIECE_LUTS]
+    bitboards.append(bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5])
+    bitboards.append(bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11])
+    return bitboards
+
+
+def bitboards_to_rows(bitboards: List[int]) -> List[str]:
+    cells = bytearray(EMPTY_BOARD)
+    for index, code in enumerate(PIECE_CODES):
+        for square in iter_bits(bitboards[index]):
+            cells[square] = code
+    squares = cells.decode("ascii")
+    return [squares[row * 8:row * 8 + 8] for row in range(8)]
+
+
+def piece_index_at(bitboards: List[int], square: int) -> int:
+    bit = 1 << square
+    if bitboards[OCC_WHITE] & bit:
+        indexes = range(6)
+    elif bitboards[OCC_BLACK] & bit:
+        indexes = range(6, 12)
+    else:
+        return -1
+    for index in indexes:
+        if bitboards[index] & bit:
+            return index
+    return -1
 
-    return moves
 
+def piece_at(bitboards: List[int], square: int) -> str:
+    index = piece_index_at(bitboards, square)
+    return "." if index < 0 else PIECES[index]
 
-def find_king(board: List[List[str]], player: int) -> Optional[Dict[str, int]]:
-    target = "K" if player == 1 else "k"
-    for row in range(8):
-        for col in range(8):
-            if board[row][col] == target:
-                return {"row": row, "col": col}
-    return None
 
+def make_move(bitboards: List[int], from_square: int, to_square: int) -> Optional[Tuple[int, int, int]]:
+    from_bit = 1 << from_square
+    to_bit = 1 << to_square
+    mover = piece_index_at(bitboards, from_square)
+    if mover < 0:
+        return None
+    captured = piece_index_at(bitboards, to_square)
+    if captured >= 0:
+        bitboards[captured] ^= to_bit
+        bitboards[PIECE_OCCUPANCY[captured]] ^= to_bit
+    placed = mover
+    if PIECE_TYPE[mover] == PAWN and to_bit & PROMOTION_ROWS:
+        placed = mover - PAWN + QUEEN
+    bitboards[mover] ^= from_bit
+    bitboards[placed] ^= to_bit
+    bitboards[PIECE_OCCUPANCY[mover]] ^= from_bit | to_bit
+    return mover, placed, captured
+
+
+def unmake_move(
+    bitboards: List[int], from_square: int, to_square: int, saved: Optional[Tuple[int, int, int]]
+) -> None:
+    if saved is None:
+        return
+    mover, placed, captured = saved
+    from_bit = 1 << from_square
+    to_bit = 1 << to_square
+    bitboards[placed] ^= to_bit
+    bitboards[mover] ^= from_bit
+    bitboards[PIECE_OCCUPANCY[mover]] ^= from_bit | to_bit
+    if captured >= 0:
+        bitboards[captured] ^= to_bit
+        bitboards[PIECE_OCCUPANCY[captured]] ^= to_bit
+
+
+def get_pseudo_moves(bitboards: Sequence[int], player: int) -> List[Tuple[int, int]]:
+    moves: List[Tuple[int, int]] = []
+    if player == 1:
+        base = 0
+        own = bitboards[OCC_WHITE]
+        enemy = bitboards[OCC_BLACK]
+    else:
+        base = 6
+        own = bitboards[OCC_BLACK]
+        enemy = bitboards[OCC_WHITE]
+    empty = FULL_BOARD ^ (own | enemy)
+    targets_mask = FULL_BOARD ^ own
+
+    pawns = bitboards[base + PAWN]
+    if player == 1:
+        single = (pawns >> 8) & empty
+        double = ((single & ROW_MASKS[5]) >> 8) & empty
+        left = (pawns >> 9) & NOT_FILE_H & enemy
+        right = (pawns >> 7) & NOT_FILE_A & enemy
+        step = 8
+    else:
+        single = (pawns << 8) & empty
+        double = ((single & ROW_MASKS[2]) << 8) & empty
+        left = (pawns << 7) & NOT_FILE_H & enemy
+        right = (pawns << 9) & NOT_FILE_A & enemy
+        step = -8
+    for targets, offset in ((single, step), (double, step * 2), (left, step + 1), (right, step - 1)):
+        for to_square in iter_bits(targets):
+            moves.append((to_square + offset, to_square))
+
+    for from_square in iter_bits(bitboards[base + KNIGHT]):
+        for to_square in iter_bits(KNIGHT_ATTACKS[from_square] & targets_mask):
+            moves.append((from_square, to_square))
+
+    occupied = own | enemy
+    for index, directions in (
+        (BISHOP, BISHOP_DIRECTIONS),
+        (ROOK, ROOK_DIRECTIONS),
+        (QUEEN, ROOK_DIRECTIONS + BISHOP_DIRECTIONS),
+    ):
+        for from_square in iter_bits(bitboards[base + index]):
+            for to_square in iter_bits(ray_attacks(from_square, occupied, directions) & targets_mask):
+                moves.append((from_square, to_square))
+
+    for from_square in iter_bits(bitboards[base + KING]):
+        for to_square in iter_bits(KING_ATTACKS[from_square] & targets_mask):
+            moves.append((from_square, to_square))
 
-def is_square_attacked(board: List[List[str]], row: int, col: int, attacker: int) -> bool:
-    for r in range(8):
-        for c in range(8):
-            piece = board[r][c]
-            if piece == "." or get_player(piece) != attacker:
-                continue
-            piece_type = piece.lower()
-            if piece_type == "p":
-                direction = -1 if attacker == 1 else 1
-                attacks = [(direction, -1), (direction, 1)]
-                if any(r + dr == row and c + dc == col for dr, dc in attacks):
-                    return True
-            elif piece_type == "n":
-                jumps = [
-                    (2, 1), (1, 2), (-1, 2), (-2, 1),
-                    (-2, -1), (-1, -2), (1, -2), (2, -1),
-                ]
-                if any(r + dr == row and c + dc == col for dr, dc in jumps):
-                    return True
-            elif piece_type in ("b", "r", "q"):
-                directions: List[tuple[int, int]] = []
-                if piece_type in ("b", "q"):
-                    directions += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-                if piece_type in ("r", "q"):
-                    directions += [(1, 0), (-1, 0), (0, 1), (0, -1)]
-                for dr, dc in directions:
-                    tr = r + dr
-                    tc = c + dc
-                    while is_inside(tr, tc):
-                        if tr == row and tc == col:
-                            return True
-                        if board[tr][tc] != ".":
-                            break
-                        tr += dr
-                        tc += dc
-            elif piece_type == "k":
-                if abs(r - row) <= 1 and abs(c - col) <= 1:
-                    return True
-    return False
-
-
-def is_in_check(board: List[List[str]], player: int) -> bool:
-    king_pos = find_king(board, player)
-    if not king_pos:
-        return False
-    opponent = 2 if player == 1 else 1
-    return is_square_attacked(board, king_pos["row"], king_pos["col"], opponent)
-
-
-def get_legal_moves(board: List[List[str]], player: int) -> List[Dict[str, Dict[str, int]]]:
-    moves: List[Dict[str, Dict[str, int]]] = []
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece == "." or get_player(piece) != player:
-                continue
-            for to_idx in get_pseudo_moves(board, row, col, piece):
-                clone = [r[:] for r in board]
-                apply_move(clone, {"row": row, "col": col}, to_idx)
-                if not is_in_check(clone, player):
-                    moves.append({"from": {"row": row, "col": col}, "to": to_idx})
     return moves
 
 
-def is_legal_move(board: List[List[str]], from_idx: Dict[str, int], to_idx: Dict[str, int], player: int) -> bool:
-    return any(
-        move["from"]["row"] == from_idx["row"]
-        and move["from"]["col"] == from_idx["col"]
-        and move["to"]["row"] == to_idx["row"]
-        and move["to"]["col"] == to_idx["col"]
-        for move in get_legal_moves(board, player)
-    )
+def find_king(bitboards: Sequence[int], player: int) -> Optional[int]:
+    king = bitboards[KING if player == 1 else 6 + KING]
+    if not king:
+        return None
+    return (king & -king).bit_length() - 1
+
+
+def _make_is_square_attacked(attacker: int) -> Callable[[Sequence[int], int], bool]:
+    base = 0 if attacker == 1 else 6
+    pawn_table = PAWN_ATTACKS_B if attacker == 1 else PAWN_ATTACKS_W
+    pawn, knight, bishop, rook, queen, king = range(base, base + 6)
+
+    def is_attacked(bitboards: Sequence[int], square: int) -> bool:
+        if pawn_table[square] & bitboards[pawn]:
+            return True
+        if KNIGHT_ATTACKS[square] & bitboards[knight]:
+            return True
+        occupied = bitboards[OCC_WHITE] | bitboards[OCC_BLACK]
+        queens = bitboards[queen]
+        diagonal = bitboards[bishop] | queens
+        if diagonal and ray_attacks(square, occupied, BISHOP_DIRECTIONS) & diagonal:
+            return True
+        straight = bitboards[rook] | queens
+        if straight and ray_attacks(square, occupied, ROOK_DIRECTIONS) & straight:
+            return True
+        return bool(KING_ATTACKS[square] & bitboards[king])
+
+    return is_attacked
+
+
+def _make_is_in_check(player: int) -> Callable[[Sequence[int]], bool]:
+    king = KING if player == 1 else 6 + KING
+    is_attacked = SQUARE_ATTACKED[3 - player]
 
+    def in_check(bitboards: Sequence[int]) -> bool:
+        bits = bitboards[king]
+        if not bits:
+            return False
+        return is_attacked(bitboards, (bits & -bits).bit_length() - 1)
 
-def check_for_game_end(board: List[List[str]], player_to_move: int) -> Optional[Dict[str, Any]]:
-    legal_moves = get_legal_moves(board, player_to_move)
-    if legal_moves:
+    return in_check
+
+
+SQUARE_ATTACKED = (None, _make_is_square_attacked(1), _make_is_square_attacked(2))
+IS_IN_CHECK = (None, _make_is_in_check(1), _make_is_in_check(2))
+
+
+def is_square_attacked(bitboards: Sequence[int], square: int, attacker: int) -> bool:
+    return SQUARE_ATTACKED[attacker](bitboards, square)
+
+
+def is_in_check(bitboards: Sequence[int], player: int) -> bool:
+    return IS_IN_CHECK[player](bitboards)
+
+
+def compute_pins(bitboards: Sequence[int], king_square: int, player: int) -> int:
+    if player == 1:
+        own = bitboards[OCC_WHITE]
+        base = 6
+    else:
+        own = bitboards[OCC_BLACK]
+        base = 0
+    occupied = bitboards[OCC_WHITE] | bitboards[OCC_BLACK]
+    queens = bitboards[base + QUEEN]
+    pinned = 0
+    for directions, sliders in (
+        (BISHOP_DIRECTIONS, bitboards[base + BISHOP] | queens),
+        (ROOK_DIRECTIONS, bitboards[base + ROOK] | queens),
+    ):
+        if not sliders:
+            continue
+        for direction in directions:
+            blockers = RAYS[direction][king_square] & occupied
+            if not blockers:
+                continue
+            first = (blockers & -blockers).bit_length() - 1 if direction < 4 else blockers.bit_length() - 1
+            if not own >> first & 1:
+                continue
+            beyond = RAYS[direction][first] & occupied
+            if not beyond:
+                continue
+            second = (beyond & -beyond).bit_length() - 1 if direction < 4 else beyond.bit_length() - 1
+            if sliders >> second & 1:
+                pinned |= 1 << first
+    return pinned
+
+
+def iter_legal_moves(bitboards: Sequence[int], player: int) -> Iterator[Tuple[int, int]]:
+    king_square = find_king(bitboards, player)
+    if king_square is None:
+        yield from get_pseudo_moves(bitboards, player)
+        return
+    checked = is_square_attacked(bitboards, king_square, 3 - player)
+    pinned = 0 if checked else compute_pins(bitboards, king_square, player)
+    in_check_after = IS_IN_CHECK[player]
+    board = list(bitboards)
+    for from_square, to_square in get_pseudo_moves(bitboards, player):
+        if not checked and from_square != king_square and not pinned >> from_square & 1:
+            yield from_square, to_square
+            continue
+        saved = make_move(board, from_square, to_square)
+        in_check = in_check_after(board)
+        unmake_move(board, from_square, to_square, saved)
+        if not in_check:
+            yield from_square, to_square
+
+
+@lru_cache(maxsize=1024)
+def get_legal_moves_set(bitboards: Tuple[int, ...], player: int) -> FrozenSet[Move]:
+    moves: Set[Move] = set()
+    for from_square, to_square in iter_legal_moves(bitboards, player):
+        from_row, from_col = divmod(from_square, 8)
+        to_row, to_col = divmod(to_square, 8)
+        moves.add((from_row, from_col, to_row, to_col))
+    return frozenset(moves)
+
+
+def is_legal_move(legal_moves: FrozenSet[Move], from_idx: Dict[str, int], to_idx: Dict[str, int]) -> bool:
+    return (from_idx["row"], from_idx["col"], to_idx["row"], to_idx["col"]) in legal_moves
+
+
+def check_for_game_end(bitboards: List[int], player_to_move: int) -> Optional[Dict[str, Any]]:
+    if get_legal_moves_set(tuple(bitboards), player_to_move):
         return None
-    if is_in_check(board, player_to_move):
+    if is_in_check(bitboards, player_to_move):
         winner = 2 if player_to_move == 1 else 1
         return {"title": "Checkmate", "message": f"Winner: Player {winner}", "winner": winner}
     return {"title": "Draw", "message": "Stalemate", "winner": None}
 
 
 @router.get("/state")
-def get_state(request: Request, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "state", *STATE_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+def get_state(
+    game: str = Query(GAME_PUBLIC),
+    session_id: str = Depends(get_session_id),
+) -> Response:
+    game_id = get_game_id(game)
+    with game_lock(game_id):
         current = get_game(game_id)
         if game_id == GAME_SEATS:
             if expire_seats(current, int(time.time())):
                 current["version"] += 1
                 save_state()
-        return with_meta(game_id, current, session_id)
+        return Response(content=with_meta_json(game_id, current, session_id), media_type="application/json")
 
 
 @router.post("/seat")
-def seat(request: Request, payload: SeatRequest) -> Dict[str, Any]:
-    enforce_rate_limit(request, "seat", *MUTATION_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
+def seat(
+    payload: SeatRequest,
+    session_id: str = Depends(get_session_id),
+) -> Dict[str, Any]:
+    with game_lock(GAME_SEATS):
         game = get_game(GAME_SEATS)
         now = int(time.time())
         seat_result = claim_seat(game, session_id, now)
@@ -306,62 +467,43 @@ def seat(request: Request, payload: SeatRequest) -> Dict[str, Any]:
 
 
 @router.post("/move")
-def post_move(request: Request, payload: MoveRequest, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "move", *MUTATION_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+def post_move(
+    payload: MoveRequest,
+    game: str = Query(GAME_PUBLIC),
+    session_id: str = Depends(get_session_id),
+) -> Dict[str, Any]:
+    game_id = get_game_id(game)
+    with game_lock(game_id):
         current = get_game(game_id)
         seat_changed = False
         if game_id == GAME_SEATS:
             seat_changed = expire_seats(current, int(time.time()))
         if current["game_over"]:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Game over", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Game over", seat_changed)
         if payload.player not in (1, 2):
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Invalid player", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Invalid player", seat_changed)
         if payload.player != current["current_player"]:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Not your turn", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Not your turn", seat_changed)
         from_idx = coord_to_index(payload.from_square.lower())
         to_idx = coord_to_index(payload.to_square.lower())
         if not from_idx or not to_idx:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Invalid coordinates", "state": with_meta(game_id, current, session_id)}
-        board = rows_to_board(current["board"])
-        if get_player(board[from_idx["row"]][from_idx["col"]]) != payload.player:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Not your piece", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Invalid coordinates", seat_changed)
+        board = rows_to_bitboards(current["board"])
+        from_square = from_idx["row"] * 8 + from_idx["col"]
+        to_square = to_idx["row"] * 8 + to_idx["col"]
+        if get_player(piece_at(board, from_square)) != payload.player:
+            return error_response(game_id, current, session_id, "Not your piece", seat_changed)
         if game_id == GAME_SEATS:
             seat_player = seat_player_for_session(current, session_id)
             if seat_player is None:
-                if seat_changed:
-                    current["version"] += 1
-                    save_state()
-                return {"ok": False, "error": "Seat required", "state": with_meta(game_id, current, session_id)}
+                return error_response(game_id, current, session_id, "Seat required", seat_changed)
             if seat_player != payload.player:
-                if seat_changed:
-                    current["version"] += 1
-                    save_state()
-                return {"ok": False, "error": "Seat mismatch", "state": with_meta(game_id, current, session_id)}
-        if not is_legal_move(board, from_idx, to_idx, payload.player):
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Illegal move", "state": with_meta(game_id, current, session_id)}
+                return error_response(game_id, current, session_id, "Seat mismatch", seat_changed)
+        legal_moves = get_legal_moves_set(tuple(board), payload.player)
+        if not is_legal_move(legal_moves, from_idx, to_idx):
+            return error_response(game_id, current, session_id, "Illegal move", seat_changed)
 
-        apply_move(board, from_idx, to_idx)
+        make_move(board, from_square, to_square)
         now = int(time.time())
         if current.get("started_at") is None:
             current["started_at"] = now
@@ -371,10 +513,8 @@ def post_move(request: Request, payload: MoveRequest, game: str = Query(GAME_PUB
             seat = current["seats"].get(seat_key)
             if seat:
                 seat["last_active"] = now
-        current["board"] = board_to_rows(board)
+        current["board"] = bitboards_to_rows(board)
         current["move_history"].append(f"P{payload.player}: {payload.from_square}-{payload.to_square}")
-        if len(current["move_history"]) > MAX_HISTORY:
-            current["move_history"] = current["move_history"][-MAX_HISTORY:]
         next_player = 2 if payload.player == 1 else 1
         current["current_player"] = next_player
         result = check_for_game_end(board, next_player)
@@ -395,27 +535,29 @@ def post_move(request: Request, payload: MoveRequest, game: str = Query(GAME_PUB
 
 
 @router.post("/reset")
-def reset_game(request: Request, payload: ResetRequest, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "reset", *MUTATION_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+def reset_game(
+    payload: ResetRequest,
+    game: str = Query(GAME_PUBLIC),
+    session_id: str = Depends(get_session_id),
+) -> Dict[str, Any]:
+    game_id = get_game_id(game)
+    with game_lock(game_id):
         current = get_game(game_id)
         if payload.player not in (1, 2):
-            return {"ok": False, "error": "Invalid player", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Invalid player")
         if not current["game_over"]:
-            return {"ok": False, "error": "Game still running", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Game still running")
         if game_id == GAME_SEATS:
             seat_player = seat_player_for_session(current, session_id)
             if seat_player != payload.player:
-                return {"ok": False, "error": "Seat required", "state": with_meta(game_id, current, session_id)}
+                return error_response(game_id, current, session_id, "Seat required")
         stats = current.get("stats", {"p1_wins": 0, "p2_wins": 0, "draws": 0, "total_games": 0})
         seats = current.get("seats") if game_id == GAME_SEATS else None
         replacement = default_game_state()
         replacement["stats"] = stats
         if game_id == GAME_SEATS:
             replacement["seats"] = seats or {"p1": None, "p2": None}
-        replacement["version"] += 1
+        replacement["version"] = current["version"] + 1
         game_container = get_game(game_id)
         game_container.clear()
         game_container.update(replacement)
@@ -1,95 +1,135 @@
 from __future__ import annotations
 
+import asyncio
 import secrets
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query, Request, status
-from pydantic import BaseModel, Field
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from starlette.requests import HTTPConnection
 
-from .limiter import allow_request
 from .state import (
     GAME_HNEFATAFL,
     GAME_PUBLIC,
     GAME_SEATS,
-    MAX_HISTORY,
     claim_seat,
     default_hnefatafl_game_state,
     expire_seats,
+    game_lock,
     get_game,
     get_game_id,
+    notify_subscribers,
     save_state,
     seat_player_for_session,
-    state_lock,
+    subscribe,
+    unsubscribe,
     with_meta,
+    with_meta_json,
 )
 
 router = APIRouter()
 
+Bitboards = Tuple[int, int, int]
 
-class MoveRequest(BaseModel):
-    player: int
-    from_square: str = Field(..., alias="from")
-    to_square: str = Field(..., alias="to")
 
-    class Config:
-        populate_by_name = True
-
-
-class ResetRequest(BaseModel):
-    player: int
-
-
-class SeatRequest(BaseModel):
-    pass
+class GameContext(NamedTuple):
+    session_id: str
+    game_id: str
 
 
 FILES = ["a", "b", "c", "d", "e", "f", "g", "h", "i"]
 BOARD_SIZE = 9
 CASTLES = {(0, 0), (0, 8), (8, 0), (8, 8)}
 THRONE = (4, 4)
+PIECES = "DAK"
+PIECE_CODES = PIECES.encode("ascii")
+EMPTY_BOARD = b"." * (BOARD_SIZE * BOARD_SIZE)
+PIECE_LUTS = [bytes(49 if code == ord(piece) else 48 for code in range(256)) for piece in PIECES]
+DEFENDERS, ATTACKERS, KING = range(3)
+FULL_BOARD = (1 << (BOARD_SIZE * BOARD_SIZE)) - 1
+FIRST_COLUMN = sum(1 << (row * BOARD_SIZE) for row in range(BOARD_SIZE))
+NOT_FIRST_COLUMN = FULL_BOARD ^ FIRST_COLUMN
+NOT_LAST_COLUMN = FULL_BOARD ^ (FIRST_COLUMN << (BOARD_SIZE - 1))
+COORD_TABLE = {
+    f"{file}{BOARD_SIZE - row}": (row, col) for row in range(BOARD_SIZE) for col, file in enumerate(FILES)
+}
 STATE_RATE_LIMIT = (240, 60)
+SOCKET_RATE_LIMIT = (30, 60)
+SOCKET_REFRESH_SECONDS = 30
 MUTATION_RATE_LIMIT = (30, 60)
+ROUTE_LIMITS = {
+    "/hnefatafl/state": ("hnefatafl_state", *STATE_RATE_LIMIT),
+    "/hnefatafl/ws": ("hnefatafl_ws", *SOCKET_RATE_LIMIT),
+    "/hnefatafl/seat": ("hnefatafl_seat", *MUTATION_RATE_LIMIT),
+    "/hnefatafl/move": ("hnefatafl_move", *MUTATION_RATE_LIMIT),
+    "/hnefatafl/reset": ("hnefatafl_reset", *MUTATION_RATE_LIMIT),
+}
+
+
+def error_response(
+    game_id: str, current: Dict[str, Any], session_id: str, message: str, seat_changed: bool = False
+) -> Dict[str, Any]:
+    if seat_changed:
+        current["version"] += 1
+        save_state()
+        notify_subscribers(game_id, GAME_HNEFATAFL)
+    return {"ok": False, "error": message, "state": with_meta(game_id, current, session_id)}
 
 
-def get_session_id(request: Request) -> str:
-    session_id = request.session.get("session_id")
+def get_session_id(connection: HTTPConnection) -> str:
+    session_id = getattr(connection.state, "session_id", None) or connection.session.get("session_id")
     if not session_id:
         session_id = secrets.token_urlsafe(16)
-        request.session["session_id"] = session_id
+        connection.session["session_id"] = session_id
     return session_id
 
 
-def client_bucket(request: Request, action: str) -> str:
-    forwarded = request.headers.get("x-forwarded-for")
-    if forwarded:
-        client_ip = forwarded.split(",")[0].strip()
-    else:
-        client_ip = request.client.host if request.client else "unknown"
-    return f"{client_ip}:{action}"
+def game_context(connection: HTTPConnection, game: str = Query(GAME_PUBLIC)) -> GameContext:
+    return GameContext(get_session_id(connection), get_game_id(game))
 
 
-def enforce_rate_limit(request: Request, action: str, limit: int, window: int) -> None:
-    bucket = client_bucket(request, action)
-    if not allow_request(bucket, limit, window):
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
+def is_json_content_type(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return True
+    main_type, _, subtype = content_type.partition(";")[0].strip().lower().partition("/")
+    return main_type == "application" and (subtype == "json" or subtype.endswith("+json"))
 
 
-def coord_to_index(coord: str) -> Optional[Dict[str, int]]:
-    if len(coord) != 2:
-        return None
-    file = coord[0]
+def invalid_body() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid request body")
+
+
+async def read_body(request: Request) -> Dict[str, Any]:
+    if not is_json_content_type(request.headers.get("content-type")):
+        raise invalid_body()
     try:
-        rank = int(coord[1])
-    except ValueError:
-        return None
-    col = FILES.index(file) if file in FILES else -1
-    if col < 0:
-        return None
-    row = BOARD_SIZE - rank
-    if row < 0 or row >= BOARD_SIZE:
-        return None
-    return {"row": row, "col": col}
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise invalid_body() from None
+    if not isinstance(body, dict):
+        raise invalid_body()
+    return body
+
+
+def parse_player(body: Dict[str, Any]) -> int:
+    player = body.get("player")
+    if type(player) is not int:
+        raise invalid_body()
+    return player
+
+
+def parse_move(body: Dict[str, Any]) -> Tuple[int, str, str]:
+    player = parse_player(body)
+    from_square = body.get("from", body.get("from_square"))
+    to_square = body.get("to", body.get("to_square"))
+    if type(from_square) is not str or type(to_square) is not str:
+        raise invalid_body()
+    return player, from_square, to_square
+
+
+def coord_to_index(coord: str) -> Optional[Tuple[int, int]]:
+    return COORD_TABLE.get(coord)
 
 
 def get_player(piece: str) -> int:
@@ -104,250 +144,296 @@ def is_inside(row: int, col: int) -> bool:
     return 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE
 
 
-def is_special_square(row: int, col: int) -> bool:
-    return (row, col) == THRONE or (row, col) in CASTLES
+def square_bit(row: int, col: int) -> int:
+    return 1 << (row * BOARD_SIZE + col)
 
 
-def is_friendly(board: List[List[str]], row: int, col: int, player: int) -> bool:
-    piece = board[row][col]
-    return piece != "." and get_player(piece) == player
+def shift_south(bits: int) -> int:
+    return (bits << BOARD_SIZE) & FULL_BOARD
 
 
-def rows_to_board(rows: List[str]) -> List[List[str]]:
-    return [list(row) for row in rows]
+def shift_north(bits: int) -> int:
+    return bits >> BOARD_SIZE
 
 
-def board_to_rows(board: List[List[str]]) -> List[str]:
-    return ["".join(row) for row in board]
+def shift_east(bits: int) -> int:
+    return (bits << 1) & NOT_FIRST_COLUMN
 
 
-def path_clear(board: List[List[str]], from_idx: Dict[str, int], to_idx: Dict[str, int], piece: str) -> bool:
-    from_row = from_idx["row"]
-    from_col = from_idx["col"]
-    to_row = to_idx["row"]
-    to_col = to_idx["col"]
-    if from_row == to_row and from_col == to_col:
-        return False
-    if from_row != to_row and from_col != to_col:
+def shift_west(bits: int) -> int:
+    return (bits >> 1) & NOT_LAST_COLUMN
+
+
+STEPS = (shift_south, shift_north, shift_east, shift_west)
+
+
+def build_capture_pairs() -> List[Tuple[Tuple[int, int], ...]]:
+    pairs: List[Tuple[Tuple[int, int], ...]] = []
+    for square in range(BOARD_SIZE * BOARD_SIZE):
+        bit = 1 << square
+        square_pairs = []
+        for step in STEPS:
+            adjacent = step(bit)
+            beyond = step(adjacent)
+            if beyond:
+                square_pairs.append((adjacent, beyond))
+        pairs.append(tuple(square_pairs))
+    return pairs
+
+
+def build_between() -> List[Dict[int, int]]:
+    between: List[Dict[int, int]] = []
+    for square in range(BOARD_SIZE * BOARD_SIZE):
+        row, col = divmod(square, BOARD_SIZE)
+        masks: Dict[int, int] = {}
+        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            mask = 0
+            target_row = row + dr
+            target_col = col + dc
+            while is_inside(target_row, target_col):
+                masks[target_row * BOARD_SIZE + target_col] = mask
+                mask |= square_bit(target_row, target_col)
+                target_row += dr
+                target_col += dc
+        between.append(masks)
+    return between
+
+
+BETWEEN = build_between()
+NEIGHBOR_MASK = [
+    shift_south(1 << square) | shift_north(1 << square) | shift_east(1 << square) | shift_west(1 << square)
+    for square in range(BOARD_SIZE * BOARD_SIZE)
+]
+CAPTURE_PAIRS = build_capture_pairs()
+CASTLE_SQUARES = tuple(row * BOARD_SIZE + col for row, col in sorted(CASTLES))
+CASTLE_MASK = sum(1 << square for square in CASTLE_SQUARES)
+SPECIAL_MASK = CASTLE_MASK | square_bit(*THRONE)
+CASTLE_ADJ = {square: NEIGHBOR_MASK[square] for square in CASTLE_SQUARES}
+CASTLE_NEIGHBORS = sum(CASTLE_ADJ.values())
+
+
+def rows_to_bitboards(rows: List[str]) -> Bitboards:
+    squares = "".join(rows).encode("ascii")[::-1]
+    defenders, attackers, king = (int(squares.translate(table), 2) for table in PIECE_LUTS)
+    return defenders, attackers, king
+
+
+def bitboards_to_rows(bitboards: Bitboards) -> List[str]:
+    cells = bytearray(EMPTY_BOARD)
+    for bits, code in zip(bitboards, PIECE_CODES):
+        while bits:
+            lowest = bits & -bits
+            cells[lowest.bit_length() - 1] = code
+            bits ^= lowest
+    squares = cells.decode("ascii")
+    return [squares[row * BOARD_SIZE:(row + 1) * BOARD_SIZE] for row in range(BOARD_SIZE)]
+
+
+def piece_at(bitboards: Bitboards, square: int) -> str:
+    bit = 1 << square
+    for bits, piece in zip(bitboards, PIECES):
+        if bits & bit:
+            return piece
+    return "."
+
+
+def path_clear(bitboards: Bitboards, from_square: int, to_square: int, piece: str) -> bool:
+    between = BETWEEN[from_square].get(to_square)
+    if between is None:
         return False
-    if board[to_row][to_col] != ".":
+    path = between | (1 << to_square)
+    defenders, attackers, king = bitboards
+    if path & (defenders | attackers | king):
         return False
-    if piece != "K" and is_special_square(to_row, to_col):
+    if piece != "K" and path & SPECIAL_MASK:
         return False
-    step_row = 0 if from_row == to_row else (1 if to_row > from_row else -1)
-    step_col = 0 if from_col == to_col else (1 if to_col > from_col else -1)
-    cur_row = from_row + step_row
-    cur_col = from_col + step_col
-    while (cur_row, cur_col) != (to_row, to_col):
-        if board[cur_row][cur_col] != ".":
-            return False
-        if piece != "K" and is_special_square(cur_row, cur_col):
-            return False
-        cur_row += step_row
-        cur_col += step_col
     return True
 
 
-def apply_move(board: List[List[str]], from_idx: Dict[str, int], to_idx: Dict[str, int]) -> None:
-    piece = board[from_idx["row"]][from_idx["col"]]
-    board[to_idx["row"]][to_idx["col"]] = piece
-    board[from_idx["row"]][from_idx["col"]] = "."
-
-
-def collect_captures(board: List[List[str]], row: int, col: int, player: int) -> List[Tuple[int, int]]:
-    captures: List[Tuple[int, int]] = []
-    for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-        adj_row = row + dr
-        adj_col = col + dc
-        if not is_inside(adj_row, adj_col):
-            continue
-        adj_piece = board[adj_row][adj_col]
-        if adj_piece == "." or get_player(adj_piece) == player or adj_piece == "K":
-            continue
-        beyond_row = adj_row + dr
-        beyond_col = adj_col + dc
-        if not is_inside(beyond_row, beyond_col):
-            continue
-        beyond_piece = board[beyond_row][beyond_col]
-        if beyond_piece != "." and get_player(beyond_piece) == player:
-            captures.append((adj_row, adj_col))
-    return captures
-
-
-def apply_captures(board: List[List[str]], captures: List[Tuple[int, int]]) -> None:
-    for row, col in captures:
-        board[row][col] = "."
-
-
-def find_king(board: List[List[str]]) -> Optional[Tuple[int, int]]:
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            if board[row][col] == "K":
-                return row, col
-    return None
+def apply_move_and_capture(bitboards: Bitboards, from_square: int, to_square: int, player: int) -> Bitboards:
+    from_bit = 1 << from_square
+    to_bit = 1 << to_square
+    move = from_bit | to_bit
+    defenders, attackers, king = bitboards
+    if defenders & from_bit:
+        defenders ^= move
+    elif attackers & from_bit:
+        attackers ^= move
+    elif king & from_bit:
+        king ^= move
+    if player == 1:
+        enemy = attackers
+        friendly = defenders | king
+    else:
+        enemy = defenders
+        friendly = attackers
+    captures = 0
+    for adjacent, beyond in CAPTURE_PAIRS[to_square]:
+        if adjacent & enemy and beyond & friendly:
+            captures |= adjacent
+    if captures:
+        return defenders & ~captures, attackers & ~captures, king
+    return defenders, attackers, king
+
+
+def find_king(bitboards: Bitboards) -> Optional[int]:
+    king = bitboards[KING]
+    if not king:
+        return None
+    return (king & -king).bit_length() - 1
 
 
-def is_king_captured(board: List[List[str]]) -> bool:
-    king_pos = find_king(board)
-    if not king_pos:
+def is_king_captured(bitboards: Bitboards) -> bool:
+    king_square = find_king(bitboards)
+    if king_square is None:
         return True
-    row, col = king_pos
-    neighbors = []
-    for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-        nr = row + dr
-        nc = col + dc
-        if is_inside(nr, nc):
-            neighbors.append((nr, nc))
-    return neighbors and all(board[nr][nc] == "A" for nr, nc in neighbors)
+    neighbors = NEIGHBOR_MASK[king_square]
+    return bitboards[ATTACKERS] & neighbors == neighbors
 
 
-def is_king_on_castle(board: List[List[str]]) -> bool:
-    for row, col in CASTLES:
-        if board[row][col] == "K":
-            return True
-    return False
+def is_king_on_castle(bitboards: Bitboards) -> bool:
+    return bool(bitboards[KING] & CASTLE_MASK)
 
 
-def is_castle_blocked(board: List[List[str]], castle: Tuple[int, int]) -> bool:
-    row, col = castle
-    adjacent = []
-    for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-        nr = row + dr
-        nc = col + dc
-        if is_inside(nr, nc):
-            adjacent.append((nr, nc))
-    return len(adjacent) == 2 and all(board[nr][nc] == "A" for nr, nc in adjacent)
+def is_castle_blocked(bitboards: Bitboards, castle_square: int) -> bool:
+    adjacent = CASTLE_ADJ[castle_square]
+    return bitboards[ATTACKERS] & adjacent == adjacent
 
 
-def all_castles_blocked(board: List[List[str]]) -> bool:
-    return all(is_castle_blocked(board, castle) for castle in CASTLES)
+def all_castles_blocked(bitboards: Bitboards) -> bool:
+    return all(is_castle_blocked(bitboards, castle) for castle in CASTLE_SQUARES)
 
 
-def is_legal_move(board: List[List[str]], from_idx: Dict[str, int], to_idx: Dict[str, int], player: int) -> bool:
-    piece = board[from_idx["row"]][from_idx["col"]]
+def play_move(bitboards: Bitboards, from_square: int, to_square: int, player: int) -> Optional[Bitboards]:
+    piece = piece_at(bitboards, from_square)
     if get_player(piece) != player:
-        return False
-    if not path_clear(board, from_idx, to_idx, piece):
-        return False
-    clone = [row[:] for row in board]
-    apply_move(clone, from_idx, to_idx)
-    captures = collect_captures(clone, to_idx["row"], to_idx["col"], player)
-    apply_captures(clone, captures)
-    if player == 2 and all_castles_blocked(clone):
-        return False
-    return True
+        return None
+    if not path_clear(bitboards, from_square, to_square, piece):
+        return None
+    moved = apply_move_and_capture(bitboards, from_square, to_square, player)
+    if player == 2 and (1 << to_square) & CASTLE_NEIGHBORS and all_castles_blocked(moved):
+        return None
+    return moved
 
 
-def check_for_game_end(board: List[List[str]]) -> Optional[Dict[str, Any]]:
-    if is_king_on_castle(board):
+def check_for_game_end(bitboards: Bitboards) -> Optional[Dict[str, Any]]:
+    if is_king_on_castle(bitboards):
         return {"title": "Escape", "message": "Winner: Player 1", "winner": 1}
-    if is_king_captured(board):
+    if is_king_captured(bitboards):
         return {"title": "Capture", "message": "Winner: Player 2", "winner": 2}
     return None
 
 
-@router.get("/hnefatafl/state")
-def get_state(request: Request, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "hnefatafl_state", *STATE_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+def read_state(game_id: str, session_id: Optional[str]) -> Tuple[int, bytes]:
+    with game_lock(game_id, GAME_HNEFATAFL):
         current = get_game(game_id, GAME_HNEFATAFL)
         if game_id == GAME_SEATS:
             if expire_seats(current, int(time.time())):
                 current["version"] += 1
                 save_state()
-        return with_meta(game_id, current, session_id)
+                notify_subscribers(game_id, GAME_HNEFATAFL)
+        return current["version"], with_meta_json(game_id, current, session_id)
+
+
+@router.get("/hnefatafl/state")
+async def get_state(ctx: GameContext = Depends(game_context)) -> Response:
+    _, payload = read_state(ctx.game_id, ctx.session_id)
+    return Response(content=payload, media_type="application/json")
+
+
+async def drain_socket(websocket: WebSocket, changed: asyncio.Event) -> None:
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        changed.set()
+
+
+@router.websocket("/hnefatafl/ws")
+async def state_socket(websocket: WebSocket, ctx: GameContext = Depends(game_context)) -> None:
+    session_id, game_id = ctx
+    await websocket.accept()
+    changed = subscribe(game_id, GAME_HNEFATAFL)
+    receiver = asyncio.create_task(drain_socket(websocket, changed))
+    last_version = None
+    try:
+        while not receiver.done():
+            version, payload = read_state(game_id, session_id)
+            if version != last_version:
+                last_version = version
+                await websocket.send_text(payload.decode())
+            try:
+                await asyncio.wait_for(changed.wait(), SOCKET_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            changed.clear()
+    except (WebSocketDisconnect, OSError):
+        pass
+    finally:
+        unsubscribe(changed, game_id, GAME_HNEFATAFL)
+        receiver.cancel()
 
 
 @router.post("/hnefatafl/seat")
-def seat(request: Request, payload: SeatRequest) -> Dict[str, Any]:
-    enforce_rate_limit(request, "hnefatafl_seat", *MUTATION_RATE_LIMIT)
+async def seat(request: Request) -> Dict[str, Any]:
     session_id = get_session_id(request)
-    with state_lock:
+    with game_lock(GAME_SEATS, GAME_HNEFATAFL):
         game = get_game(GAME_SEATS, GAME_HNEFATAFL)
         now = int(time.time())
         seat_result = claim_seat(game, session_id, now)
         game["version"] += 1
         save_state()
+        notify_subscribers(GAME_SEATS, GAME_HNEFATAFL)
         response = with_meta(GAME_SEATS, game, seat_result["session_id"])
         return {"ok": True, "player": seat_result["player"], "state": response}
 
 
 @router.post("/hnefatafl/move")
-def post_move(request: Request, payload: MoveRequest, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "hnefatafl_move", *MUTATION_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+async def post_move(request: Request, ctx: GameContext = Depends(game_context)) -> Dict[str, Any]:
+    player, from_coord, to_coord = parse_move(await read_body(request))
+    session_id, game_id = ctx
+    with game_lock(game_id, GAME_HNEFATAFL):
         current = get_game(game_id, GAME_HNEFATAFL)
         seat_changed = False
         if game_id == GAME_SEATS:
             seat_changed = expire_seats(current, int(time.time()))
         if current["game_over"]:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Game over", "state": with_meta(game_id, current, session_id)}
-        if payload.player not in (1, 2):
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Invalid player", "state": with_meta(game_id, current, session_id)}
-        if payload.player != current["current_player"]:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Not your turn", "state": with_meta(game_id, current, session_id)}
-        from_idx = coord_to_index(payload.from_square.lower())
-        to_idx = coord_to_index(payload.to_square.lower())
+            return error_response(game_id, current, session_id, "Game over", seat_changed)
+        if player not in (1, 2):
+            return error_response(game_id, current, session_id, "Invalid player", seat_changed)
+        if player != current["current_player"]:
+            return error_response(game_id, current, session_id, "Not your turn", seat_changed)
+        from_idx = coord_to_index(from_coord.lower())
+        to_idx = coord_to_index(to_coord.lower())
         if not from_idx or not to_idx:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Invalid coordinates", "state": with_meta(game_id, current, session_id)}
-        board = rows_to_board(current["board"])
-        if get_player(board[from_idx["row"]][from_idx["col"]]) != payload.player:
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Not your piece", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Invalid coordinates", seat_changed)
+        board = rows_to_bitboards(current["board"])
+        from_square = from_idx[0] * BOARD_SIZE + from_idx[1]
+        to_square = to_idx[0] * BOARD_SIZE + to_idx[1]
+        if get_player(piece_at(board, from_square)) != player:
+            return error_response(game_id, current, session_id, "Not your piece", seat_changed)
         if game_id == GAME_SEATS:
             seat_player = seat_player_for_session(current, session_id)
             if seat_player is None:
-                if seat_changed:
-                    current["version"] += 1
-                    save_state()
-                return {"ok": False, "error": "Seat required", "state": with_meta(game_id, current, session_id)}
-            if seat_player != payload.player:
-                if seat_changed:
-                    current["version"] += 1
-                    save_state()
-                return {"ok": False, "error": "Seat mismatch", "state": with_meta(game_id, current, session_id)}
-        if not is_legal_move(board, from_idx, to_idx, payload.player):
-            if seat_changed:
-                current["version"] += 1
-                save_state()
-            return {"ok": False, "error": "Illegal move", "state": with_meta(game_id, current, session_id)}
-
-        apply_move(board, from_idx, to_idx)
-        captures = collect_captures(board, to_idx["row"], to_idx["col"], payload.player)
-        apply_captures(board, captures)
+                return error_response(game_id, current, session_id, "Seat required", seat_changed)
+            if seat_player != player:
+                return error_response(game_id, current, session_id, "Seat mismatch", seat_changed)
+        board = play_move(board, from_square, to_square, player)
+        if board is None:
+            return error_response(game_id, current, session_id, "Illegal move", seat_changed)
 
         now = int(time.time())
         if current.get("started_at") is None:
             current["started_at"] = now
         current["last_played_at"] = now
         if game_id == GAME_SEATS:
-            seat_key = "p1" if payload.player == 1 else "p2"
+            seat_key = "p1" if player == 1 else "p2"
             seat = current["seats"].get(seat_key)
             if seat:
                 seat["last_active"] = now
-        current["board"] = board_to_rows(board)
-        current["move_history"].append(f"P{payload.player}: {payload.from_square}-{payload.to_square}")
-        if len(current["move_history"]) > MAX_HISTORY:
-            current["move_history"] = current["move_history"][-MAX_HISTORY:]
-        next_player = 2 if payload.player == 1 else 1
+        current["board"] = bitboards_to_rows(board)
+        current["move_history"].append(f"P{player}: {from_coord}-{to_coord}")
+        next_player = 2 if player == 1 else 1
         current["current_player"] = next_player
         result = check_for_game_end(board)
         current["game_over"] = result is not None
@@ -363,33 +449,34 @@ def post_move(request: Request, payload: MoveRequest, game: str = Query(GAME_PUB
             current["stats"]["total_games"] += 1
         current["version"] += 1
         save_state()
+        notify_subscribers(game_id, GAME_HNEFATAFL)
         return {"ok": True, "state": with_meta(game_id, current, session_id)}
 
 
 @router.post("/hnefatafl/reset")
-def reset_game(request: Request, payload: ResetRequest, game: str = Query(GAME_PUBLIC)) -> Dict[str, Any]:
-    enforce_rate_limit(request, "hnefatafl_reset", *MUTATION_RATE_LIMIT)
-    session_id = get_session_id(request)
-    with state_lock:
-        game_id = get_game_id(game)
+async def reset_game(request: Request, ctx: GameContext = Depends(game_context)) -> Dict[str, Any]:
+    player = parse_player(await read_body(request))
+    session_id, game_id = ctx
+    with game_lock(game_id, GAME_HNEFATAFL):
         current = get_game(game_id, GAME_HNEFATAFL)
-        if payload.player not in (1, 2):
-            return {"ok": False, "error": "Invalid player", "state": with_meta(game_id, current, session_id)}
+        if player not in (1, 2):
+            return error_response(game_id, current, session_id, "Invalid player")
         if not current["game_over"]:
-            return {"ok": False, "error": "Game still running", "state": with_meta(game_id, current, session_id)}
+            return error_response(game_id, current, session_id, "Game still running")
         if game_id == GAME_SEATS:
             seat_player = seat_player_for_session(current, session_id)
-            if seat_player != payload.player:
-                return {"ok": False, "error": "Seat required", "state": with_meta(game_id, current, session_id)}
+            if seat_player != player:
+                return error_response(game_id, current, session_id, "Seat required")
         stats = current.get("stats", {"p1_wins": 0, "p2_wins": 0, "draws": 0, "total_games": 0})
         seats = current.get("seats") if game_id == GAME_SEATS else None
         replacement = default_hnefatafl_game_state()
         replacement["stats"] = stats
         if game_id == GAME_SEATS:
             replacement["seats"] = seats or {"p1": None, "p2": None}
-        replacement["version"] += 1
+        replacement["version"] = current["version"] + 1
         game_container = get_game(game_id, GAME_HNEFATAFL)
         game_container.clear()
         game_container.update(replacement)
         save_state()
+        notify_subscribers(game_id, GAME_HNEFATAFL)
         return {"ok": True, "state": with_meta(game_id, game_container, session_id)}
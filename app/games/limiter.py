@@ -1,29 +1,35 @@
 from __future__ import annotations
 
+import random
 import threading
 import time
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
-_lock = threading.Lock()
-_buckets: Dict[str, Tuple[int, float]] = {}
+_SHARDS = 32
 _MAX_BUCKETS = 10000
+_MAX_SHARD_BUCKETS = _MAX_BUCKETS // _SHARDS
+_PRUNE_PROBABILITY = 1 / 128
+_locks: List[threading.Lock] = [threading.Lock() for _ in range(_SHARDS)]
+_bucket_shards: List[Dict[str, Tuple[int, float]]] = [{} for _ in range(_SHARDS)]
 
 
 def allow_request(key: str, limit: int, window_seconds: int) -> bool:
-    now = time.time()
-    with _lock:
-        count, window_start = _buckets.get(key, (0, now))
+    now = time.monotonic()
+    shard = hash(key) & (_SHARDS - 1)
+    buckets = _bucket_shards[shard]
+    with _locks[shard]:
+        count, window_start = buckets.get(key, (0, now))
         if now - window_start >= window_seconds:
             count = 0
             window_start = now
         count += 1
-        _buckets[key] = (count, window_start)
-        if len(_buckets) > _MAX_BUCKETS:
-            _prune(now, window_seconds)
+        buckets[key] = (count, window_start)
+        if len(buckets) > _MAX_SHARD_BUCKETS or random.random() < _PRUNE_PROBABILITY:
+            _prune(buckets, now, window_seconds)
         return count <= limit
 
 
-def _prune(now: float, window_seconds: int) -> None:
-    expired = [key for key, (_, start) in _buckets.items() if now - start >= window_seconds]
+def _prune(buckets: Dict[str, Tuple[int, float]], now: float, window_seconds: int) -> None:
+    expired = [key for key, (_, start) in buckets.items() if now - start >= window_seconds]
     for key in expired:
-        _buckets.pop(key, None)
+        buckets.pop(key, None)
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import copy
+import logging
 import os
 import secrets
 import threading
 import time
+from collections import deque
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
 
 ROOT = Path(__file__).resolve().parent.parent
 STATE_FILE = ROOT / "gamestate.json"
@@ -18,7 +26,19 @@ GAME_SEATS = "seats"
 GAME_CHESS = "chess"
 GAME_HNEFATAFL = "hnefatafl"
 
+SAVE_DEBOUNCE_SECONDS = 0.25
+
 state_lock = threading.Lock()
+GAME_LOCKS: Dict[Tuple[str, str], threading.Lock] = {
+    (game_name, game_id): threading.Lock()
+    for game_name in (GAME_CHESS, GAME_HNEFATAFL)
+    for game_id in (GAME_PUBLIC, GAME_SEATS)
+}
+_write_lock = threading.Lock()
+_dirty = threading.Event()
+_META_CACHE: Dict[int, Tuple[int, Dict[str, Any]]] = {}
+_META_JSON_CACHE: Dict[int, Tuple[int, bytes]] = {}
+SUBSCRIBERS: Dict[Tuple[str, str], Set[asyncio.Event]] = {key: set() for key in GAME_LOCKS}
 
 
 def default_game_state() -> Dict[str, Any]:
@@ -34,7 +54,7 @@ def default_game_state() -> Dict[str, Any]:
             "RNBQKBNR",
         ],
         "current_player": 1,
-        "move_history": [],
+        "move_history": deque(maxlen=MAX_HISTORY),
         "game_over": False,
         "result": None,
         "stats": {"p1_wins": 0, "p2_wins": 0, "draws": 0, "total_games": 0},
@@ -65,7 +85,7 @@ def default_hnefatafl_game_state() -> Dict[str, Any]:
     return {
         "board": ["".join(row) for row in board],
         "current_player": 1 + secrets.randbelow(2),
-        "move_history": [],
+        "move_history": deque(maxlen=MAX_HISTORY),
         "game_over": False,
         "result": None,
         "stats": {"p1_wins": 0, "p2_wins": 0, "draws": 0, "total_games": 0},
@@ -120,6 +140,8 @@ def merge_game_state(defaults: Dict[str, Any], incoming: Dict[str, Any]) -> Dict
                 "p1": normalize_seat(value.get("p1")),
                 "p2": normalize_seat(value.get("p2")),
             }
+        elif key == "move_history" and isinstance(value, list):
+            merged["move_history"] = deque(value, maxlen=MAX_HISTORY)
         else:
             merged[key] = value
     if "seats" in defaults and "seats" not in merged:
@@ -129,12 +151,14 @@ def merge_game_state(defaults: Dict[str, Any], incoming: Dict[str, Any]) -> Dict
 
 def load_state() -> None:
     global STATE
+    _META_CACHE.clear()
+    _META_JSON_CACHE.clear()
     if not STATE_FILE.exists():
         STATE = default_state()
         return
     try:
-        data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
+        data = orjson.loads(STATE_FILE.read_bytes())
+    except orjson.JSONDecodeError:
         STATE = default_state()
         return
     if not isinstance(data, dict):
@@ -168,35 +192,106 @@ def load_state() -> None:
     STATE = state
 
 
+def write_state() -> None:
+    with _write_lock:
+        with state_lock, ExitStack() as stack:
+            for lock in GAME_LOCKS.values():
+                stack.enter_context(lock)
+            payload = orjson.dumps(STATE, default=list)
+        tmp_path = STATE_FILE.with_suffix(".json.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, STATE_FILE)
+
+
+def _state_writer() -> None:
+    while True:
+        _dirty.wait()
+        time.sleep(SAVE_DEBOUNCE_SECONDS)
+        _dirty.clear()
+        try:
+            write_state()
+        except OSError:
+            logger.exception("Failed to write %s, retrying", STATE_FILE)
+            _dirty.set()
+
+
 def save_state() -> None:
-    payload = json.dumps(STATE, indent=2)
-    tmp_path = STATE_FILE.with_suffix(".json.tmp")
-    tmp_path.write_text(payload, encoding="utf-8")
-    os.replace(tmp_path, STATE_FILE)
+    _dirty.set()
+
+
+def flush_state() -> None:
+    _dirty.clear()
+    write_state()
+
+
+threading.Thread(target=_state_writer, name="state-writer", daemon=True).start()
 
 
 def get_game_id(game: str) -> str:
     return GAME_SEATS if game == GAME_SEATS else GAME_PUBLIC
 
 
+def game_lock(game_id: str, game_name: str = GAME_CHESS) -> threading.Lock:
+    return GAME_LOCKS[(game_name, game_id)]
+
+
+def subscribe(game_id: str, game_name: str = GAME_CHESS) -> asyncio.Event:
+    changed = asyncio.Event()
+    SUBSCRIBERS[(game_name, game_id)].add(changed)
+    return changed
+
+
+def unsubscribe(changed: asyncio.Event, game_id: str, game_name: str = GAME_CHESS) -> None:
+    SUBSCRIBERS[(game_name, game_id)].discard(changed)
+
+
+def notify_subscribers(game_id: str, game_name: str = GAME_CHESS) -> None:
+    for changed in SUBSCRIBERS[(game_name, game_id)]:
+        changed.set()
+
+
 def get_game(game_id: str, game_name: str = GAME_CHESS) -> Dict[str, Any]:
     return STATE["games"][game_name][game_id]
 
 
+def meta_base(game_id: str, game: Dict[str, Any]) -> Dict[str, Any]:
+    cached = _META_CACHE.get(id(game))
+    if cached is None or cached[0] != game["version"]:
+        base = copy.deepcopy(game)
+        base["move_history"] = list(base["move_history"])
+        base["game_id"] = game_id
+        cached = (game["version"], base)
+        _META_CACHE[id(game)] = cached
+    return cached[1]
+
+
+def seat_info(game: Dict[str, Any], session_id: Optional[str]) -> Dict[str, Any]:
+    seat_player = seat_player_for_session(game, session_id)
+    return {
+        "p1": game["seats"]["p1"] is not None,
+        "p2": game["seats"]["p2"] is not None,
+        "player": seat_player or 0,
+    }
+
+
 def with_meta(game_id: str, game: Dict[str, Any], session_id: Optional[str] = None) -> Dict[str, Any]:
-    response = dict(game)
-    response["game_id"] = game_id
-    response["server_time"] = int(time.time())
+    response = {**meta_base(game_id, game), "server_time": int(time.time())}
     if game_id == GAME_SEATS:
-        seat_player = seat_player_for_session(game, session_id)
-        response["seat_info"] = {
-            "p1": game["seats"]["p1"] is not None,
-            "p2": game["seats"]["p2"] is not None,
-            "player": seat_player or 0,
-        }
+        response["seat_info"] = seat_info(game, session_id)
     return response
 
 
+def with_meta_json(game_id: str, game: Dict[str, Any], session_id: Optional[str] = None) -> bytes:
+    cached = _META_JSON_CACHE.get(id(game))
+    if cached is None or cached[0] != game["version"]:
+        cached = (game["version"], orjson.dumps(meta_base(game_id, game))[:-1])
+        _META_JSON_CACHE[id(game)] = cached
+    tail = b',"server_time":%d' % int(time.time())
+    if game_id == GAME_SEATS:
+        tail += b',"seat_info":' + orjson.dumps(seat_info(game, session_id))
+    return cached[1] + tail + b"}"
+
+
 def expire_seats(game: Dict[str, Any], now: int) -> bool:
     seats = game.get("seats")
     if not isinstance(seats, dict):
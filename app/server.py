@@ -1,23 +1,94 @@
 from __future__ import annotations
 
+import gzip
 import os
+import secrets
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Dict, Tuple
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.datastructures import Headers
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from games.chess import ROUTE_LIMITS as CHESS_ROUTE_LIMITS
 from games.chess import router as chess_router
+from games.hnefatafl import ROUTE_LIMITS as HNEFATAFL_ROUTE_LIMITS
 from games.hnefatafl import router as hnefatafl_router
-from games.state import GAME_PUBLIC, GAME_SEATS, load_state, state_lock
+from games.limiter import allow_request
+from games.state import GAME_PUBLIC, GAME_SEATS, flush_state, load_state, state_lock
 
 ROOT = Path(__file__).resolve().parent
+COMPRESSIBLE_SUFFIXES = {".css", ".html", ".js", ".svg"}
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    gzip_quality = wildcard_quality = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        if coding in ("gzip", "x-gzip"):
+            gzip_quality = quality
+        elif coding == "*":
+            wildcard_quality = quality
+    if gzip_quality is None:
+        gzip_quality = wildcard_quality
+    return bool(gzip_quality)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, directory: str) -> None:
+        super().__init__(directory=directory)
+        self.gzipped: Dict[str, Tuple[float, bytes]] = {}
+        for path in Path(directory).rglob("*"):
+            if path.suffix in COMPRESSIBLE_SUFFIXES and path.is_file():
+                self.gzip_content(str(path), path.stat())
+
+    def gzip_content(self, full_path: str, stat_result: os.stat_result) -> bytes:
+        cached = self.gzipped.get(full_path)
+        if cached is None or cached[0] != stat_result.st_mtime:
+            with open(full_path, "rb") as source:
+                cached = (stat_result.st_mtime, gzip.compress(source.read(), 9))
+            self.gzipped[full_path] = cached
+        return cached[1]
+
+    def file_response(
+        self, full_path: Any, stat_result: os.stat_result, scope: Scope, status_code: int = 200
+    ) -> Response:
+        if os.path.splitext(full_path)[1] not in COMPRESSIBLE_SUFFIXES:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        request_headers = Headers(scope=scope)
+        if not accepts_gzip(request_headers.get("accept-encoding", "")):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["vary"] = "Accept-Encoding"
+            return response
+        identity = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        headers = {key: value for key, value in identity.headers.items() if key != "content-length"}
+        headers["etag"] = headers["etag"][:-1] + '-gzip"'
+        headers["content-encoding"] = "gzip"
+        headers["vary"] = "Accept-Encoding"
+        response_headers = Headers(headers=headers)
+        if self.is_not_modified(response_headers, request_headers):
+            return NotModifiedResponse(response_headers)
+        return Response(self.gzip_content(str(full_path), stat_result), status_code=status_code, headers=headers)
+
 
 app = FastAPI()
 templates = Jinja2Templates(directory=str(ROOT / "templates"))
-app.mount("/static", StaticFiles(directory=str(ROOT / "static")), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=str(ROOT / "static")), name="static")
 
 SECRET_KEY = os.environ.get("SECRET_KEY")
 SESSION_COOKIE = os.environ.get("SESSION_COOKIE", "web_games_session")
@@ -27,6 +98,47 @@ SESSION_SAMESITE = os.environ.get("SESSION_SAMESITE", "lax")
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY must be set for signed session cookies.")
 
+ROUTE_LIMITS = {**CHESS_ROUTE_LIMITS, **HNEFATAFL_ROUTE_LIMITS}
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        route = ROUTE_LIMITS.get(path)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        client_ip = Headers(scope=scope).get("x-forwarded-for", "").partition(",")[0].strip()
+        if not client_ip:
+            client = scope.get("client")
+            client_ip = client[0] if client else "unknown"
+        action, limit, window = route
+        if not allow_request(f"{client_ip}:{action}", limit, window):
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1008})
+            else:
+                response = JSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+                await response(scope, receive, send)
+            return
+        session = scope["session"]
+        session_id = session.get("session_id")
+        if not session_id:
+            session_id = secrets.token_urlsafe(16)
+            session["session_id"] = session_id
+        scope.setdefault("state", {})["session_id"] = session_id
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     SessionMiddleware,
     secret_key=SECRET_KEY,
@@ -42,118 +154,118 @@ def startup_event() -> None:
         load_state()
 
 
+@app.on_event("shutdown")
+def shutdown_event() -> None:
+    flush_state()
+
+
+@lru_cache(maxsize=None)
+def render_page(template_name: str, **context: Any) -> bytes:
+    return templates.get_template(template_name).render(context).encode("utf-8")
+
+
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "home.html",
-        {"request": request, "title": "Web Games Console Style"},
-    )
+def home() -> HTMLResponse:
+    return HTMLResponse(render_page("home.html", title="Web Games Console Style"))
 
 
 @app.get("/games/chess/p1", response_class=HTMLResponse)
-def chess_p1(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "chess.html",
-        {
-            "request": request,
-            "title": "Chess Console",
-            "subtitle": "Public game: Player 1 view.",
-            "game_mode": GAME_PUBLIC,
-            "player": 1,
-            "show_actions": True,
-            "footer_note": "Use links above to switch perspective.",
-        },
+def chess_p1() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "chess.html",
+            title="Chess Console",
+            subtitle="Public game: Player 1 view.",
+            game_mode=GAME_PUBLIC,
+            player=1,
+            show_actions=True,
+            footer_note="Use links above to switch perspective.",
+        )
     )
 
 
 @app.get("/games/chess/p2", response_class=HTMLResponse)
-def chess_p2(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "chess.html",
-        {
-            "request": request,
-            "title": "Chess Console",
-            "subtitle": "Public game: Player 2 view.",
-            "game_mode": GAME_PUBLIC,
-            "player": 2,
-            "show_actions": True,
-            "footer_note": "Use links above to switch perspective.",
-        },
+def chess_p2() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "chess.html",
+            title="Chess Console",
+            subtitle="Public game: Player 2 view.",
+            game_mode=GAME_PUBLIC,
+            player=2,
+            show_actions=True,
+            footer_note="Use links above to switch perspective.",
+        )
     )
 
 
 @app.get("/games/chess/seats", response_class=HTMLResponse)
-def chess_seats(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "chess.html",
-        {
-            "request": request,
-            "title": "Chess Seats",
-            "subtitle": "Seat mode: claim Seat 1 (white) or Seat 2 (black).",
-            "game_mode": GAME_SEATS,
-            "player": 0,
-            "show_actions": False,
-            "footer_note": "Seats expire after 5 minutes on your turn.",
-        },
+def chess_seats() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "chess.html",
+            title="Chess Seats",
+            subtitle="Seat mode: claim Seat 1 (white) or Seat 2 (black).",
+            game_mode=GAME_SEATS,
+            player=0,
+            show_actions=False,
+            footer_note="Seats expire after 5 minutes on your turn.",
+        )
     )
 
 
 @app.get("/games/hnefatafl/p1", response_class=HTMLResponse)
-def hnefatafl_p1(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "hnefatafl.html",
-        {
-            "request": request,
-            "title": "Hnefatafl Console",
-            "subtitle": "Public game: Player 1 view (defenders).",
-            "game_mode": GAME_PUBLIC,
-            "player": 1,
-            "show_actions": True,
-            "footer_note": "Defenders escort the king to a castle.",
-        },
+def hnefatafl_p1() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "hnefatafl.html",
+            title="Hnefatafl Console",
+            subtitle="Public game: Player 1 view (defenders).",
+            game_mode=GAME_PUBLIC,
+            player=1,
+            show_actions=True,
+            footer_note="Defenders escort the king to a castle.",
+        )
     )
 
 
 @app.get("/games/hnefatafl/p2", response_class=HTMLResponse)
-def hnefatafl_p2(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "hnefatafl.html",
-        {
-            "request": request,
-            "title": "Hnefatafl Console",
-            "subtitle": "Public game: Player 2 view (attackers).",
-            "game_mode": GAME_PUBLIC,
-            "player": 2,
-            "show_actions": True,
-            "footer_note": "Attackers surround the king.",
-        },
+def hnefatafl_p2() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "hnefatafl.html",
+            title="Hnefatafl Console",
+            subtitle="Public game: Player 2 view (attackers).",
+            game_mode=GAME_PUBLIC,
+            player=2,
+            show_actions=True,
+            footer_note="Attackers surround the king.",
+        )
     )
 
 
 @app.get("/games/hnefatafl/seats", response_class=HTMLResponse)
-def hnefatafl_seats(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "hnefatafl.html",
-        {
-            "request": request,
-            "title": "Hnefatafl Seats",
-            "subtitle": "Seat mode: claim Seat 1 (defenders) or Seat 2 (attackers).",
-            "game_mode": GAME_SEATS,
-            "player": 0,
-            "show_actions": False,
-            "footer_note": "Seats expire after 5 minutes on your turn.",
-        },
+def hnefatafl_seats() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "hnefatafl.html",
+            title="Hnefatafl Seats",
+            subtitle="Seat mode: claim Seat 1 (defenders) or Seat 2 (attackers).",
+            game_mode=GAME_SEATS,
+            player=0,
+            show_actions=False,
+            footer_note="Seats expire after 5 minutes on your turn.",
+        )
     )
 
 
 @app.get("/games/tetris", response_class=HTMLResponse)
-def tetris(request: Request) -> HTMLResponse:
-    return templates.TemplateResponse(
-        "tetris.html",
-        {
-            "request": request,
-            "title": "Tetris Console",
-        },
+def tetris() -> HTMLResponse:
+    return HTMLResponse(
+        render_page(
+            "tetris.html",
+            title="Tetris Console",
+        )
     )
 
 
@@ -337,6 +337,11 @@ async function claimSeat() {
   }
 }
 
+function buildSocketUrl() {
+  const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+  return `${scheme}://${window.location.host}/hnefatafl/ws?game=${getGameQuery()}`;
+}
+
 function startPolling() {
   if (pollTimer) {
     clearInterval(pollTimer);
@@ -344,14 +349,51 @@ function startPolling() {
   pollTimer = setInterval(() => {
     fetchState();
   }, 1500);
-  if (gameMode === "seats") {
-    claimSeat();
-  } else {
-    fetchState();
+}
+
+function stopPolling() {
+  if (pollTimer) {
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+}
+
+function connectSocket() {
+  if (!("WebSocket" in window)) {
+    return;
   }
+  const socket = new WebSocket(buildSocketUrl());
+  let connected = false;
+  socket.addEventListener("open", () => {
+    connected = true;
+    stopPolling();
+  });
+  socket.addEventListener("message", (event) => {
+    const data = JSON.parse(event.data);
+    if (lastVersion !== data.version) {
+      lastVersion = data.version;
+      applyState(data);
+    }
+  });
+  socket.addEventListener("close", () => {
+    if (connected) {
+      startPolling();
+    }
+    setTimeout(connectSocket, 5000);
+  });
+}
+
+async function startSync() {
+  startPolling();
   if (!timeTimer) {
     timeTimer = setInterval(updateTimeLine, 1000);
   }
+  if (gameMode === "seats") {
+    await claimSeat();
+  } else {
+    await fetchState();
+  }
+  connectSocket();
 }
 
 function updateInputAvailability() {
@@ -408,4 +450,4 @@ if (gameMode === "seats") {
   seatPlayer = 0;
   viewPlayer = 0;
 }
-startPolling();
+startSync();